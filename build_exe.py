@@ -4,22 +4,46 @@
 使用 PyInstaller 将 GUI 程序打包成 exe 文件
 
 使用方法：
-    python build_exe.py
+    python build_exe.py                  # 默认 onedir：输出一个文件夹，启动快
+    python build_exe.py --mode onefile   # 单个 exe 文件，便于分发但每次启动都要先解压
+
+打包模式取舍：
+    onedir  - 程序和依赖直接放在 dist/Tsensor温度处理工具/ 目录下，启动时直接加载，无需解压；
+              分发时需要拷贝整个文件夹
+    onefile - 所有内容压缩进单个 exe，每次启动都先解压到临时目录再运行，冷启动明显更慢
 
 注意：建议在全新的虚拟环境中打包，避免打包不必要的依赖
     1. 创建虚拟环境: python -m venv venv_build
     2. 激活虚拟环境
-    3. 安装必要依赖: pip install pyinstaller openpyxl
+    3. 安装必要依赖: pip install pyinstaller "openpyxl>=3.1"
+       （--optimize 参数需要 PyInstaller 6.0 及以上；处理模块依赖 openpyxl 3.1 起 merged_cells.ranges 为集合的行为）
+       可选：pip install xlsxwriter，安装后程序自动改用更快、更省内存的 xlsxwriter 写入结果
     4. 运行打包: python build_exe.py
 """
 
+import argparse
+import shutil
 import subprocess
 import sys
 from pathlib import Path
 
 
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="使用 PyInstaller 打包 Tsensor 温度处理工具")
+    parser.add_argument(
+        "--mode",
+        choices=["onedir", "onefile"],
+        default="onedir",
+        help="打包模式：onedir 启动快（默认），onefile 输出单个 exe",
+    )
+    return parser.parse_args()
+
+
 def main():
     """执行打包"""
+    args = parse_args()
+    
     # 获取脚本所在目录
     script_dir = Path(__file__).parent
     gui_file = script_dir / "process_temperature_gui.py"
@@ -30,13 +54,14 @@ def main():
     
     print("开始打包 GUI 程序...")
     print(f"入口文件: {gui_file}")
+    print(f"打包模式: {args.mode}")
     print("提示：建议在全新的虚拟环境中打包，避免包含不必要的依赖包")
     print("-" * 60)
     
     # PyInstaller 命令参数
     cmd = [
         "pyinstaller",
-        "--onefile",                    # 打包成单个 exe 文件
+        f"--{args.mode}",                # onedir 输出文件夹（免解压，启动快）/ onefile 输出单个 exe
         "--windowed",                    # Windows 下隐藏控制台窗口（macOS/Linux 使用 --noconsole）
         "--name=Tsensor温度处理工具",    # 输出 exe 名称
         "--hidden-import=openpyxl",      # 显式导入 openpyxl（确保被包含）
@@ -55,6 +80,16 @@ def main():
         "--exclude-module=PySide2",      # 排除 PySide2
         "--exclude-module=PySide6",      # 排除 PySide6
         "--exclude-module=tkinter.test", # 排除 tkinter 测试模块
+        # 运行时用不到的标准库模块
+        "--exclude-module=unittest",     # 排除 unittest
+        "--exclude-module=xml.sax",      # 排除 xml.sax（openpyxl 使用 xml.etree）
+        "--exclude-module=pydoc_data",   # 排除 pydoc 文档数据
+        "--exclude-module=email.mime",   # 排除 email.mime
+        "--exclude-module=http.server",  # 排除 http.server
+        "--exclude-module=distutils",    # 排除 distutils
+        "--exclude-module=lib2to3",      # 排除 lib2to3
+        "--exclude-module=_pytest",      # 排除 pytest
+        "--optimize=2",                  # 以 -OO 级别编译字节码（去掉 docstring 和 assert）
         str(gui_file),
     ]
     
@@ -65,6 +100,18 @@ def main():
         cmd[2] = "--noconsole"
     # Windows 使用 --windowed
     
+    # 去除二进制中的符号表以减小体积；Windows 下 strip 可能损坏 DLL，不启用
+    if sys.platform != "win32":
+        cmd.insert(-1, "--strip")
+    
+    # 检测到 UPX 时压缩打包的二进制文件，未安装则跳过
+    upx_path = shutil.which("upx")
+    if upx_path:
+        cmd.insert(-1, f"--upx-dir={Path(upx_path).parent}")
+        print(f"检测到 UPX: {upx_path}")
+    else:
+        print("未检测到 UPX，跳过二进制压缩（可从 https://upx.github.io 安装）")
+    
     print(f"执行命令: {' '.join(cmd)}")
     print("-" * 60)
     
@@ -73,11 +120,15 @@ def main():
         result = subprocess.run(cmd, check=True, cwd=str(script_dir))
         print("-" * 60)
         print("打包完成！")
-        print(f"输出目录: {script_dir / 'dist'}")
+        # onedir 模式下可执行文件位于同名子目录中
+        output_dir = script_dir / 'dist'
+        if args.mode == "onedir":
+            output_dir = output_dir / 'Tsensor温度处理工具'
+        print(f"输出目录: {output_dir}")
         if sys.platform == "win32":
-            print(f"exe 文件: {script_dir / 'dist' / 'Tsensor温度处理工具.exe'}")
+            print(f"exe 文件: {output_dir / 'Tsensor温度处理工具.exe'}")
         else:
-            print(f"可执行文件: {script_dir / 'dist' / 'Tsensor温度处理工具'}")
+            print(f"可执行文件: {output_dir / 'Tsensor温度处理工具'}")
     except subprocess.CalledProcessError as e:
         print(f"打包失败: {e}")
         sys.exit(1)
@@ -87,7 +138,7 @@ def main():
         print("\n建议在全新虚拟环境中打包：")
         print("  1. python -m venv venv_build")
         print("  2. 激活虚拟环境（Windows: venv_build\\Scripts\\activate，macOS/Linux: source venv_build/bin/activate）")
-        print("  3. pip install pyinstaller openpyxl")
+        print('  3. pip install pyinstaller "openpyxl>=3.1"')
         print("  4. python build_exe.py")
         sys.exit(1)
 
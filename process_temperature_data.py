@@ -7,17 +7,34 @@
 2. 根据template/template.xlsx中的通道位置映射
 3. 生成包含均值图和所有测试块数据的新Excel文件
 4. 应用红绿渐变条件格式
+
+依赖: openpyxl>=3.1（write-only 模式下直接向 merged_cells.ranges 集合登记合并区域）
 """
 
+import mmap
 import re
 from pathlib import Path
 from openpyxl import load_workbook, Workbook
 from openpyxl.styles import PatternFill, Alignment, Font
 from openpyxl.formatting.rule import ColorScaleRule
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.cell_range import CellRange
 from collections import defaultdict
 from typing import List, Dict, Tuple, Optional
 
 
+# 整段扫描时不再逐行 strip，行首/行尾空白由模式本身容忍；
+# 空白只匹配空格和制表符，保证一次匹配不会跨越换行
+# 分隔符行: #####数字#####
+_SEP_RE = re.compile(rb'^[ \t]*#####(\d+)#####[ \t]*\r?$', re.MULTILINE)
+# 数据行: chnl X, valid 1, temp Z（兼容旧日志中的 vaild 拼写）
+# 只匹配 valid=1 的行，无效行由正则引擎直接跳过，不产生匹配对象
+_ROW_RE = re.compile(rb'^[ \t]*chnl[ \t]+(\d+),[ \t]+va(?:li|il)d[ \t]+1,[ \t]+temp[ \t]+([-\d.]+)', re.MULTILINE)
+# 分隔符与数据行合并为一个交替模式，单次 finditer 即可完成扫描
+_RECORD_RE = re.compile(_SEP_RE.pattern + b'|' + _ROW_RE.pattern, re.MULTILINE)
+
+
 def parse_data_file(file_path: str) -> Tuple[List[Dict[int, float]], List[str]]:
     """
     解析data1.txt文件，按#####数字#####分块，提取vaild=1的chnl和temp数据
@@ -36,31 +53,29 @@ def parse_data_file(file_path: str) -> Tuple[List[Dict[int, float]], List[str]]:
     current_block = {}
     current_title = None
     
-    with open(data_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            
+    # 空文件无法内存映射，也没有任何数据
+    if data_path.stat().st_size == 0:
+        return blocks, block_titles
+    
+    # 热循环内用局部名绑定内建函数，避免每条记录重复查找全局/属性
+    int_ = int
+    float_ = float
+    
+    # 只读内存映射整个文件，由正则引擎在 C 层完成整段扫描，无需读入副本或逐行解码/strip
+    with open(data_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        for sep_title, chnl, temp in map(re.Match.groups, _RECORD_RE.finditer(data)):
             # 检测新的测试块分隔符
-            match_separator = re.match(r'^#####(\d+)#####$', line)
-            if match_separator:
+            if sep_title is not None:
                 # 如果当前块有数据，保存它
                 if current_block:
                     blocks.append(current_block)
                     block_titles.append(current_title if current_title else "Unknown")
                 current_block = {}
-                current_title = match_separator.group(1)  # 提取分隔符中的数字
+                current_title = sep_title.decode('ascii')  # 提取分隔符中的数字
                 continue
             
-            # 解析数据行: chnl X, vaild Y, temp Z
-            match = re.match(r'chnl\s+(\d+),\s+vaild\s+(\d+),\s+temp\s+([-\d.]+)', line)
-            if match:
-                chnl = int(match.group(1))
-                valid = int(match.group(2))
-                temp = float(match.group(3))
-                
-                # 只保存vaild=1的数据
-                if valid == 1:
-                    current_block[chnl] = temp
+            # 正则只匹配vaild=1的数据行
+            current_block[int_(chnl)] = float_(temp)
     
     # 保存最后一个块
     if current_block:
@@ -70,13 +85,13 @@ def parse_data_file(file_path: str) -> Tuple[List[Dict[int, float]], List[str]]:
     return blocks, block_titles
 
 
-def read_template_mapping(template_path: str) -> Tuple[Dict[Tuple[int, int], int], int, int]:
+def read_template_mapping(template_path: str) -> Tuple[List[Tuple[int, int, int]], int, int]:
     """
     读取模板Excel，建立通道号到行列位置的映射关系
     
     Returns:
-        Tuple[Dict[Tuple[int, int], int], int, int]:
-            - 映射字典: {(row, col): chnl}
+        Tuple[List[Tuple[int, int, int]], int, int]:
+            - 映射列表: [(row, col, chnl), ...]，按 (row, col) 升序排列
             - 最大行数
             - 最大列数
     """
@@ -84,24 +99,34 @@ def read_template_mapping(template_path: str) -> Tuple[Dict[Tuple[int, int], int
     if not template_file.exists():
         raise FileNotFoundError(f"模板文件不存在: {template_path}")
     
-    wb = load_workbook(template_file)
-    ws = wb['Sheet1']
+    # 只读模式按行流式读取，values 直接返回值元组，不创建 Cell 对象
+    wb = load_workbook(template_file, read_only=True, data_only=True)
+    # 工作表名大小写不固定（Sheet1 / sheet1），忽略大小写查找
+    sheet_name = next((name for name in wb.sheetnames if name.lower() == 'sheet1'), 'Sheet1')
+    ws = wb[sheet_name]
+    # 只读模式默认信任文件中记录的 <dimension>，部分工具会写错该标记（如只写 A1），
+    # 重置后按实际内容遍历所有行列
+    ws.reset_dimensions()
     
-    mapping = {}  # {(row, col): chnl}
+    mapping = []  # [(row, col, chnl), ...]，逐行逐列遍历，天然按 (row, col) 有序
     max_row = 0
     max_col = 0
     
-    for row_idx, row in enumerate(ws.iter_rows(), start=1):
-        for col_idx, cell in enumerate(row, start=1):
-            if cell.value is not None:
-                try:
-                    chnl = int(cell.value)
-                    mapping[(row_idx, col_idx)] = chnl
-                    max_row = max(max_row, row_idx)
-                    max_col = max(max_col, col_idx)
-                except (ValueError, TypeError):
-                    # 如果不是整数，忽略
-                    pass
+    try:
+        for row_idx, row in enumerate(ws.values, start=1):
+            for col_idx, value in enumerate(row, start=1):
+                if value is not None:
+                    try:
+                        chnl = int(value)
+                        mapping.append((row_idx, col_idx, chnl))
+                        max_row = row_idx  # 按行顺序遍历，当前行即最大行
+                        max_col = max(max_col, col_idx)
+                    except (ValueError, TypeError):
+                        # 如果不是整数，忽略
+                        pass
+    finally:
+        # 只读模式会保持文件句柄打开，需要显式关闭
+        wb.close()
     
     return mapping, max_row, max_col
 
@@ -116,17 +141,17 @@ def calculate_average_temps(blocks: List[Dict[int, float]]) -> Dict[int, float]:
     Returns:
         Dict[int, float]: {chnl: average_temp}
     """
-    # 收集每个通道的所有有效温度值
-    chnl_temps = defaultdict(list)
+    # 单次遍历累加每个通道的温度和与计数，不保存中间列表
+    sums = defaultdict(float)
+    counts = defaultdict(int)
     
     for block in blocks:
         for chnl, temp in block.items():
-            chnl_temps[chnl].append(temp)
+            sums[chnl] += temp
+            counts[chnl] += 1
     
     # 计算平均值
-    avg_temps = {}
-    for chnl, temps in chnl_temps.items():
-        avg_temps[chnl] = sum(temps) / len(temps)
+    avg_temps = {chnl: total / counts[chnl] for chnl, total in sums.items()}
     
     return avg_temps
 
@@ -135,52 +160,109 @@ def write_title(ws, title: str, row: int, max_col: int):
     """
     在指定行写入标题，合并单元格并设置样式
     
+    工作表为 write-only 模式，标题以预设样式的 WriteOnlyCell 整行追加，
+    row 必须等于下一次 ws.append 所在的行号。
+    
     Args:
-        ws: Excel工作表对象
+        ws: Excel工作表对象（write-only）
         title: 标题文本
         row: 行号
         max_col: 最大列号（用于合并单元格）
     """
-    title_cell = ws.cell(row=row, column=1)
-    title_cell.value = title
+    title_cell = WriteOnlyCell(ws, value=title)
     title_cell.font = Font(bold=True, size=12)
     title_cell.alignment = Alignment(horizontal="center", vertical="center")
+    ws.append([title_cell])
     if max_col > 1:
-        ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=max_col)
+        # 合并区域在保存时随工作表尾部一起写出；各标题行互不重叠，直接加入集合，
+        # 跳过 merged_cells.add 对已有区域的逐个包含检查（标题数多时为平方复杂度）
+        ws.merged_cells.ranges.add(CellRange(min_col=1, min_row=row, max_col=max_col, max_row=row))
+
+
+def build_block_rows(block_data: Dict[int, float],
+                     mapping: List[Tuple[int, int, int]],
+                     max_template_row: int,
+                     max_template_col: int) -> List[List[Optional[float]]]:
+    """
+    按模板映射把一个测试块的数据组装成二维行列表（无数据的位置为None）
+    
+    Args:
+        block_data: 当前块的数据 {chnl: temp}
+        mapping: 位置映射 [(row, col, chnl), ...]
+        max_template_row: 模板最大行数（read_template_mapping 的返回值）
+        max_template_col: 模板最大列数（read_template_mapping 的返回值）
+        
+    Returns:
+        List[List[Optional[float]]]: 模板矩形区域内的行数据，可直接逐行 ws.append
+    """
+    rows = [[None] * max_template_col for _ in range(max_template_row)]
+    for template_row, template_col, chnl in mapping:
+        # 当前块没有这个通道的有效数据时 get 返回None，与空位一致，无需额外判断
+        rows[template_row - 1][template_col - 1] = block_data.get(chnl)
+    
+    return rows
 
 
 def write_block_to_excel(ws, block_data: Dict[int, float], 
-                        mapping: Dict[Tuple[int, int], int],
+                        mapping: List[Tuple[int, int, int]],
+                        max_template_row: int,
+                        max_template_col: int,
                         start_row: int) -> int:
     """
     将一个测试块的数据写入Excel的指定起始行
     
+    数据按行通过 ws.append 顺序追加，因此 start_row 必须紧接在工作表当前最后一行
+    （通常是刚写入的块标题行）之后；块末尾会追加一个空行。
+    
     Args:
         ws: Excel工作表对象
         block_data: 当前块的数据 {chnl: temp}
-        mapping: 位置映射 {(row, col): chnl}
+        mapping: 位置映射 [(row, col, chnl), ...]
+        max_template_row: 模板最大行数
+        max_template_col: 模板最大列数
         start_row: 起始行号
         
     Returns:
         int: 下一个块的起始行号（当前块结束行 + 2，留一个空行）
     """
-    # 找到当前块需要的最大行数
-    max_template_row = max(row for row, _ in mapping.keys())
+    rows = build_block_rows(block_data, mapping, max_template_row, max_template_col)
+    return write_rows_to_excel(ws, rows, start_row)
+
+
+def write_rows_to_excel(ws, rows: List[List[Optional[float]]], start_row: int) -> int:
+    """
+    将 build_block_rows 组装好的行数据写入Excel的指定起始行
     
-    # 写入数据
-    for (template_row, template_col), chnl in mapping.items():
-        excel_row = start_row + template_row - 1  # 转换为Excel中的实际行号
-        excel_col = template_col
+    Args:
+        ws: Excel工作表对象
+        rows: 模板矩形区域内的行数据
+        start_row: 起始行号（必须紧接在工作表当前最后一行之后）
         
-        # 如果当前块有这个通道的有效数据，写入温度值
-        if chnl in block_data:
-            ws.cell(row=excel_row, column=excel_col, value=block_data[chnl])
+    Returns:
+        int: 下一个块的起始行号（当前块结束行 + 2，留一个空行）
+    """
+    # 整行追加，避免逐个 ws.cell 定位单元格
+    for row in rows:
+        ws.append(row)
+    ws.append([])
     
     # 返回下一个块的起始行（当前块结束行 + 2，留一个空行）
-    return start_row + max_template_row + 1
+    return start_row + len(rows) + 1
 
 
-def apply_color_scale(ws, min_temp: float, max_temp: float):
+def block_data_range(start_row: int, row_count: int, max_col: int) -> str:
+    """
+    一个图（均值图或测试块）的数据矩形区域，如 "A2:E11"，不含标题行
+    
+    Args:
+        start_row: 数据起始行号
+        row_count: 数据行数（模板最大行数）
+        max_col: 最大列号
+    """
+    return f'A{start_row}:{get_column_letter(max_col)}{start_row + row_count - 1}'
+
+
+def apply_color_scale(ws, min_temp: float, max_temp: float, data_range: str):
     """
     对有值的单元格应用红绿渐变条件格式
     红色=高温，绿色=低温
@@ -189,13 +271,10 @@ def apply_color_scale(ws, min_temp: float, max_temp: float):
         ws: Excel工作表对象
         min_temp: 最小温度值
         max_temp: 最大温度值
+        data_range: 写入过程中记录的数据区域，多个区域以空格分隔（如 "A2:E11 A14:E23"），
+            不含标题行，也无需回读工作表尺寸
     """
-    # 获取工作表的所有有数据的范围
-    # 找到所有有值的单元格范围
-    max_row = ws.max_row
-    max_col = ws.max_column
-    
-    if max_row == 0 or max_col == 0:
+    if not data_range:
         return
     
     # 创建颜色渐变规则
@@ -212,11 +291,81 @@ def apply_color_scale(ws, min_temp: float, max_temp: float):
         end_color='FF0000'     # 红色（高温）
     )
     
-    # 应用到整个数据区域
-    data_range = f'A1:{ws.cell(row=max_row, column=max_col).coordinate}'
+    # 一条规则覆盖所有数据区域，颜色刻度在所有图之间统一
     ws.conditional_formatting.add(data_range, color_scale)
 
 
+# =========================
+# xlsxwriter 后端（可选依赖，constant_memory 模式下按行流式写盘）
+# 行列号沿用上面 openpyxl 版本的 1 起始约定，内部转换为 xlsxwriter 的 0 起始
+# =========================
+# 结果只有数值和标题文本：数值已通过 write_number 直接写入，
+# 再关闭字符串的数字/公式/URL 推断，标题写入时无需逐个做前缀检查和正则匹配；
+# constant_memory 模式下字符串内联写出，不建立共享字符串表
+XLSX_WORKBOOK_OPTIONS = {
+    'constant_memory': True,
+    'strings_to_numbers': False,
+    'strings_to_formulas': False,
+    'strings_to_urls': False,
+}
+XLSX_TITLE_FORMAT = {'bold': True, 'font_size': 12, 'align': 'center', 'valign': 'vcenter'}
+
+
+def write_title_xlsxwriter(ws, title: str, row: int, max_col: int, title_format):
+    """
+    xlsxwriter 版 write_title：在指定行写入标题并合并单元格
+    
+    Args:
+        ws: xlsxwriter 工作表对象
+        title: 标题文本
+        row: 行号
+        max_col: 最大列号（用于合并单元格）
+        title_format: 由 workbook.add_format(XLSX_TITLE_FORMAT) 创建的格式
+    """
+    if max_col > 1:
+        ws.merge_range(row - 1, 0, row - 1, max_col - 1, title, title_format)
+    else:
+        ws.write_string(row - 1, 0, title, title_format)
+
+
+def write_rows_to_xlsxwriter(ws, rows: List[List[Optional[float]]], start_row: int) -> int:
+    """
+    xlsxwriter 版 write_rows_to_excel：只写有值的单元格
+    
+    Returns:
+        int: 下一个块的起始行号（当前块结束行 + 2，留一个空行）
+    """
+    for row_offset, row in enumerate(rows, start=start_row - 1):
+        for col_offset, value in enumerate(row):
+            if value is not None:
+                ws.write_number(row_offset, col_offset, value)
+    
+    return start_row + len(rows) + 1
+
+
+def apply_color_scale_xlsxwriter(ws, min_temp: float, max_temp: float, data_range: str):
+    """
+    xlsxwriter 版 apply_color_scale：绿色(低温) -> 黄色(中温) -> 红色(高温)
+    """
+    if not data_range:
+        return
+    
+    first_range = data_range.split(' ', 1)[0]
+    ws.conditional_format(first_range, {
+        'type': '3_color_scale',
+        'multi_range': data_range,
+        'min_type': 'num',
+        'min_value': min_temp,
+        'min_color': '#00FF00',
+        'mid_type': 'num',
+        'mid_value': (min_temp + max_temp) / 2,
+        'mid_color': '#FFFF00',
+        'max_type': 'num',
+        'max_value': max_temp,
+        'max_color': '#FF0000',
+    })
+
+
 def main():
     """主函数"""
     # 文件路径
@@ -237,6 +386,8 @@ def main():
     # 2. 读取模板映射
     print("2. 读取模板映射...")
     mapping, max_template_row, max_template_col = read_template_mapping(template_file)
+    if not mapping:
+        raise ValueError(f"模板中未找到通道位置: {template_file}")
     print(f"   模板大小: {max_template_row} 行 x {max_template_col} 列")
     print(f"   找到 {len(mapping)} 个通道位置")
     
@@ -247,12 +398,13 @@ def main():
     
     # 4. 创建新Excel
     print("4. 生成Excel文件...")
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "result"
+    # write-only 模式逐行流式写出 XML，不在内存中保留整张单元格表
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("result")
     
-    # 收集所有温度值，用于条件格式
-    all_temps = []
+    # 边写入边统计温度范围，用于条件格式
+    min_temp = float('inf')
+    max_temp = float('-inf')
     
     # 4.1 先写入均值图标题和数据（最上面）
     print("   写入均值数据图...")
@@ -260,20 +412,22 @@ def main():
     write_title(ws, "Average Temperature Map", row=1, max_col=max_template_col)
     
     # 写入均值图数据（从第2行开始）
-    current_row = 2
-    for (template_row, template_col), chnl in mapping.items():
-        excel_row = current_row + template_row - 1
-        excel_col = template_col
-        if chnl in avg_temps:
-            temp = avg_temps[chnl]
-            ws.cell(row=excel_row, column=excel_col, value=temp)
-            all_temps.append(temp)
-    
-    # 4.2 写入各个测试块（均值图下方，留空行）
-    # 均值图结束行 = current_row + max_template_row - 1
+    # 均值图结束行 = 2 + max_template_row - 1
     # 下一个位置 = 均值图结束行 + 2（留一个空行）
-    current_row = current_row + max_template_row + 1
+    current_row = write_block_to_excel(ws, avg_temps, mapping, max_template_row, max_template_col,
+                                       start_row=2)
+    # 记录各图的数据区域（不含标题行），供条件格式使用
+    data_ranges = [block_data_range(2, max_template_row, max_template_col)]
+    for _, _, chnl in mapping:
+        temp = avg_temps.get(chnl)
+        if temp is None:
+            continue
+        if temp < min_temp:
+            min_temp = temp
+        if temp > max_temp:
+            max_temp = temp
     
+    # 4.2 写入各个测试块（均值图下方，留空行）
     for i, (block, title) in enumerate(zip(blocks, block_titles), 1):
         print(f"   写入测试块 {i} (标题: {title})...")
         
@@ -282,22 +436,23 @@ def main():
         
         # 写入块数据（从标题下一行开始）
         data_start_row = current_row + 1
-        block_end_row = write_block_to_excel(ws, block, mapping, data_start_row)
+        block_end_row = write_block_to_excel(ws, block, mapping, max_template_row, max_template_col,
+                                             data_start_row)
+        data_ranges.append(block_data_range(data_start_row, max_template_row, max_template_col))
         
-        # 收集温度值
-        for temp in block.values():
-            all_temps.append(temp)
+        # 更新温度范围（解析结果中的块均非空）
+        min_temp = min(min_temp, min(block.values()))
+        max_temp = max(max_temp, max(block.values()))
         
         # 下一个块从当前块结束行 + 1个空行开始
+        ws.append([])
         current_row = block_end_row + 1
     
     # 5. 应用条件格式
-    if all_temps:
+    if min_temp <= max_temp:
         print("5. 应用条件格式...")
-        min_temp = min(all_temps)
-        max_temp = max(all_temps)
         print(f"   温度范围: {min_temp} ~ {max_temp}")
-        apply_color_scale(ws, min_temp, max_temp)
+        apply_color_scale(ws, min_temp, max_temp, " ".join(data_ranges))
     
     # 6. 保存文件
     print(f"6. 保存文件到: {output_file}")
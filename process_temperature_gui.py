@@ -10,28 +10,35 @@
 - 点击“开始生成”后执行处理，并在界面中实时显示日志
 """
 
+import collections
 import json
 import os
+import shutil
+import subprocess
+import sys
 import threading
 import traceback
 from pathlib import Path
+from typing import Optional
 
 import tkinter as tk
 from tkinter import filedialog, messagebox
 
-from openpyxl import Workbook
 
-from process_temperature_data import (
-    parse_data_file,
-    read_template_mapping,
-    calculate_average_temps,
-    write_title,
-    write_block_to_excel,
-    apply_color_scale,
-)
+def _xlsxwriter_available() -> bool:
+    """是否安装了可选依赖 xlsxwriter"""
+    import importlib.util
 
+    return importlib.util.find_spec("xlsxwriter") is not None
 
-def run_pipeline(data_file: str, template_file: str, output_dir: str, logger=None) -> Path:
+
+def run_pipeline(
+    data_file: str,
+    template_file: str,
+    output_dir: str,
+    logger=None,
+    backend: Optional[str] = None,
+) -> Path:
     """
     温度处理流水线，对外提供可复用接口。
 
@@ -40,10 +47,36 @@ def run_pipeline(data_file: str, template_file: str, output_dir: str, logger=Non
         template_file: 模板 Excel 路径
         output_dir: 输出目录路径
         logger: 可选日志回调函数，形如 logger(str)
+        backend: Excel 写入后端，"openpyxl" 或 "xlsxwriter"；
+            为 None 时若已安装 xlsxwriter 则优先使用（内存占用恒定、写盘更快）
 
     Returns:
         生成的结果 Excel 文件路径 Path 对象
     """
+    # openpyxl 与处理模块导入较重，推迟到首次执行流水线时再加载，加快窗口启动
+    from openpyxl import Workbook
+
+    from process_temperature_data import (
+        parse_data_file,
+        read_template_mapping,
+        calculate_average_temps,
+        write_title,
+        build_block_rows,
+        write_rows_to_excel,
+        apply_color_scale,
+        block_data_range,
+        XLSX_WORKBOOK_OPTIONS,
+        XLSX_TITLE_FORMAT,
+        write_title_xlsxwriter,
+        write_rows_to_xlsxwriter,
+        apply_color_scale_xlsxwriter,
+    )
+
+    if backend is None:
+        backend = "xlsxwriter" if _xlsxwriter_available() else "openpyxl"
+    if backend not in ("openpyxl", "xlsxwriter"):
+        raise ValueError(f"不支持的 Excel 写入后端: {backend}")
+    use_xlsxwriter = backend == "xlsxwriter"
 
     def log(msg: str):
         if logger is not None:
@@ -68,6 +101,8 @@ def run_pipeline(data_file: str, template_file: str, output_dir: str, logger=Non
     # 2. 读取模板映射
     log("2. 读取模板映射...")
     mapping, max_template_row, max_template_col = read_template_mapping(str(template_path))
+    if not mapping:
+        raise ValueError(f"模板中未找到通道位置: {template_path}")
     log(f"   模板大小: {max_template_row} 行 x {max_template_col} 列")
     log(f"   找到 {len(mapping)} 个通道位置")
 
@@ -78,61 +113,93 @@ def run_pipeline(data_file: str, template_file: str, output_dir: str, logger=Non
 
     # 4. 创建新 Excel
     log("4. 生成 Excel 文件...")
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "result"
-
-    # 收集所有温度值，用于条件格式
-    all_temps = []
+    log(f"   写入后端: {backend}")
+    if use_xlsxwriter:
+        import xlsxwriter
+
+        # constant_memory 模式逐行写入临时文件，内存占用与块数无关
+        wb = xlsxwriter.Workbook(str(output_file), XLSX_WORKBOOK_OPTIONS)
+        ws = wb.add_worksheet("result")
+        title_format = wb.add_format(XLSX_TITLE_FORMAT)
+    else:
+        # write-only 模式逐行流式写出 XML，不在内存中保留整张单元格表
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("result")
+
+    # 边写入边统计温度范围，用于条件格式
+    min_temp = float('inf')
+    max_temp = float('-inf')
 
     # 4.1 先写入均值图标题和数据（最上面）
     log("   写入均值数据图...")
     # 写入均值图标题
-    write_title(ws, "Average Temperature Map", row=1, max_col=max_template_col)
+    if use_xlsxwriter:
+        write_title_xlsxwriter(ws, "Average Temperature Map", row=1, max_col=max_template_col,
+                               title_format=title_format)
+    else:
+        write_title(ws, "Average Temperature Map", row=1, max_col=max_template_col)
 
     # 写入均值图数据（从第 2 行开始）
-    current_row = 2
-    for (template_row, template_col), chnl in mapping.items():
-        excel_row = current_row + template_row - 1
-        excel_col = template_col
-        if chnl in avg_temps:
-            temp = avg_temps[chnl]
-            ws.cell(row=excel_row, column=excel_col, value=temp)
-            all_temps.append(temp)
-
-    # 4.2 写入各个测试块（均值图下方，留空行）
-    # 均值图结束行 = current_row + max_template_row - 1
+    # 均值图结束行 = 2 + max_template_row - 1
     # 下一个位置 = 均值图结束行 + 2（留一个空行）
-    current_row = current_row + max_template_row + 1
+    avg_rows = build_block_rows(avg_temps, mapping, max_template_row, max_template_col)
+    if use_xlsxwriter:
+        current_row = write_rows_to_xlsxwriter(ws, avg_rows, start_row=2)
+    else:
+        current_row = write_rows_to_excel(ws, avg_rows, start_row=2)
+    # 记录各图的数据区域（不含标题行），供条件格式使用
+    data_ranges = [block_data_range(2, max_template_row, max_template_col)]
+    for _, _, chnl in mapping:
+        temp = avg_temps.get(chnl)
+        if temp is None:
+            continue
+        if temp < min_temp:
+            min_temp = temp
+        if temp > max_temp:
+            max_temp = temp
 
+    # 4.2 写入各个测试块（均值图下方，留空行）
     for i, (block, title) in enumerate(zip(blocks, block_titles), 1):
         log(f"   写入测试块 {i} (标题: {title})...")
+        rows = build_block_rows(block, mapping, max_template_row, max_template_col)
 
-        # 写入块标题
-        write_title(ws, f"Block {i} (#####{title}#####)", row=current_row, max_col=max_template_col)
-
-        # 写入块数据（从标题下一行开始）
+        # 写入块标题与块数据（数据从标题下一行开始）
+        block_title = f"Block {i} (#####{title}#####)"
         data_start_row = current_row + 1
-        block_end_row = write_block_to_excel(ws, block, mapping, data_start_row)
+        if use_xlsxwriter:
+            write_title_xlsxwriter(ws, block_title, row=current_row, max_col=max_template_col,
+                                   title_format=title_format)
+            block_end_row = write_rows_to_xlsxwriter(ws, rows, data_start_row)
+        else:
+            write_title(ws, block_title, row=current_row, max_col=max_template_col)
+            block_end_row = write_rows_to_excel(ws, rows, data_start_row)
+        data_ranges.append(block_data_range(data_start_row, max_template_row, max_template_col))
 
-        # 收集温度值
-        for temp in block.values():
-            all_temps.append(temp)
+        # 更新温度范围（解析结果中的块均非空）
+        min_temp = min(min_temp, min(block.values()))
+        max_temp = max(max_temp, max(block.values()))
 
-        # 下一个块从当前块结束行 + 1 个空行开始
+        # 下一个块从当前块结束行 + 1 个空行开始（xlsxwriter 按行号定位，无需追加空行）
+        if not use_xlsxwriter:
+            ws.append([])
         current_row = block_end_row + 1
 
     # 5. 应用条件格式
-    if all_temps:
+    if min_temp <= max_temp:
         log("5. 应用条件格式...")
-        min_temp = min(all_temps)
-        max_temp = max(all_temps)
         log(f"   温度范围: {min_temp} ~ {max_temp}")
-        apply_color_scale(ws, min_temp, max_temp)
+        data_range = " ".join(data_ranges)
+        if use_xlsxwriter:
+            apply_color_scale_xlsxwriter(ws, min_temp, max_temp, data_range)
+        else:
+            apply_color_scale(ws, min_temp, max_temp, data_range)
 
     # 6. 保存文件
     log(f"6. 保存文件到: {output_file}")
-    wb.save(str(output_file))
+    if use_xlsxwriter:
+        wb.close()
+    else:
+        wb.save(str(output_file))
 
     log("处理完成！")
     return output_file
@@ -157,6 +224,14 @@ class TemperatureGUI(tk.Tk):
         # 加载保存的路径配置
         config = self._load_config()
         
+        # 配置写入防抖：记录最近一次落盘的内容和待执行的 after 回调
+        self._last_saved_config = config
+        self._pending_save = None
+
+        # 工作线程日志先进入队列，由主线程定时批量写入日志窗口
+        self._log_queue = collections.deque()
+        self._drain_scheduled = False
+        
         # 变量（使用保存的路径或默认路径）
         self.data_file_var = tk.StringVar(value=config.get("data_file", self.default_data_file))
         self.template_file_var = tk.StringVar(value=config.get("template_file", self.default_template_file))
@@ -164,6 +239,9 @@ class TemperatureGUI(tk.Tk):
 
         self._build_ui()
 
+        # 关闭窗口前把尚未落盘的配置写出去
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+
     # =========================
     # 界面构建
     # =========================
@@ -309,17 +387,44 @@ class TemperatureGUI(tk.Tk):
         
         return {}
     
-    def _save_config(self):
-        """保存当前路径到配置文件"""
-        config = {
+    def _current_config(self) -> dict:
+        """当前界面上的路径配置"""
+        return {
             "data_file": self.data_file_var.get().strip(),
             "template_file": self.template_file_var.get().strip(),
             "output_dir": self.output_dir_var.get().strip(),
         }
+
+    def _save_config(self):
+        """保存当前路径到配置文件（防抖：连续多次调用只在最后一次后 500ms 写盘）"""
+        if self._pending_save is not None:
+            self.after_cancel(self._pending_save)
+            self._pending_save = None
+
+        # 内容未变化则无需写盘
+        if self._current_config() == self._last_saved_config:
+            return
+
+        self._pending_save = self.after(500, self._do_save_config)
+
+    def _flush_config(self):
+        """立即执行尚未触发的配置保存"""
+        if self._pending_save is not None:
+            self.after_cancel(self._pending_save)
+            self._do_save_config()
+
+    def _do_save_config(self):
+        """将当前路径写入配置文件"""
+        self._pending_save = None
+        config = self._current_config()
         
+        # 先在内存中序列化，写入临时文件后原子替换，避免写到一半时损坏配置
+        data = json.dumps(config, indent=2, ensure_ascii=False).encode('utf-8')
+        tmp_file = self._config_file.with_suffix('.tmp')
         try:
-            with open(self._config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
+            tmp_file.write_bytes(data)
+            os.replace(tmp_file, self._config_file)
+            self._last_saved_config = config
         except IOError as e:
             # 保存失败不影响程序运行，只打印错误
             print(f"保存配置文件失败: {e}")
@@ -335,8 +440,23 @@ class TemperatureGUI(tk.Tk):
         self.log_text.see(tk.END)
 
     def thread_safe_log(self, msg: str):
-        """从工作线程中安全地写日志"""
-        self.after(0, self.append_log, msg)
+        """从工作线程中安全地写日志（入队后每 50ms 批量刷新一次，避免逐条回调占满事件循环）"""
+        self._log_queue.append(msg)
+        if not self._drain_scheduled:
+            self._drain_scheduled = True
+            self.after(50, self._drain_log)
+
+    def _drain_log(self):
+        """把队列中积压的日志一次性写入日志窗口（主线程调用）"""
+        # 先清除标记再取消息：取完之后新入队的消息会重新安排一次刷新，不会滞留
+        self._drain_scheduled = False
+        lines = []
+        while self._log_queue:
+            msg = self._log_queue.popleft()
+            lines.append(msg if msg.endswith("\n") else msg + "\n")
+        if lines:
+            self.log_text.insert(tk.END, "".join(lines))
+            self.log_text.see(tk.END)
 
     def on_start_clicked(self):
         """点击“开始生成”按钮"""
@@ -400,28 +520,33 @@ class TemperatureGUI(tk.Tk):
     def open_output_dir(self):
         """打开输出目录"""
         path_str = self.output_dir_var.get().strip() or self.default_output_dir
-        path = Path(path_str).expanduser()
+        path = Path(path_str).expanduser().resolve()
         if not path.exists():
             messagebox.showwarning("提示", f"输出目录不存在：{path}")
             return
 
         try:
-            import subprocess
-            import sys
-            
-            # 根据操作系统使用不同的命令
+            # 根据操作系统使用不同的打开方式；Popen 不等待子进程结束，避免阻塞界面
             if sys.platform == "win32":
-                # Windows 使用 explorer
-                subprocess.run(["explorer", str(path)], check=False)
+                # Windows 直接调用 shell 关联程序，无需启动子进程
+                os.startfile(str(path))
             elif sys.platform == "darwin":
                 # macOS 使用 open
-                subprocess.run(["open", str(path)], check=False)
+                subprocess.Popen(["/usr/bin/open", str(path)])
             else:
-                # Linux 使用 xdg-open
-                subprocess.run(["xdg-open", str(path)], check=False)
+                # Linux 使用 xdg-open，预先解析绝对路径
+                opener = shutil.which("xdg-open")
+                if opener is None:
+                    raise FileNotFoundError("未找到 xdg-open 命令")
+                subprocess.Popen([opener, str(path)])
         except Exception as e:
             messagebox.showerror("错误", f"无法打开输出目录：{e}")
 
+    def _on_close(self):
+        """关闭窗口"""
+        self._flush_config()
+        self.destroy()
+
 
 def main():
     app = TemperatureGUI()